@@ -0,0 +1,212 @@
+from threading import Lock
+from typing import Dict, List
+import numpy as np
+
+from .inference import FEATURE_DEFAULTS, INPUT_FIELDS
+
+# ---------- Monitored inputs ----------
+# Subsystem name (same keys as load_model) → (input fields, feature_defaults.json section)
+DRIFT_INPUTS = {
+    "engine": (INPUT_FIELDS["engine"], "engine"),
+    "hydraulics": (INPUT_FIELDS["hydraulics"], "hyd"),
+    "landing_gear": (INPUT_FIELDS["landing_gear"], "lg"),
+}
+
+N_BINS = 32  # histogram bins between the training min and max (+1 underflow, +1 overflow)
+
+
+def _feature_ranges(feature_names, defaults_dict):
+    """
+    Histogram range and training bounds per feature.
+    Features with min/max stats are binned over that range and checked against it;
+    mean-only defaults (hydraulics) get a 0 → 2·mean range and no bounds.
+    """
+    lo, hi, bound_lo, bound_hi, train_mean = [], [], [], [], []
+    for f in feature_names:
+        stats = defaults_dict.get(f, None)
+        if isinstance(stats, dict):
+            mean = float(stats.get("mean", 0.0))
+            f_lo = float(stats.get("min", mean))
+            f_hi = float(stats.get("max", mean))
+            bound_lo.append(f_lo)
+            bound_hi.append(f_hi)
+        else:
+            mean = float(stats) if stats is not None else 0.0
+            f_lo, f_hi = min(0.0, 2 * mean), max(0.0, 2 * mean)
+            bound_lo.append(-np.inf)
+            bound_hi.append(np.inf)
+
+        # Constant features (e.g. op_setting_3) still need a non-empty bin range
+        if f_hi <= f_lo:
+            pad = max(abs(f_lo) * 0.01, 1e-6)
+            f_lo, f_hi = f_lo - pad, f_hi + pad
+        lo.append(f_lo)
+        hi.append(f_hi)
+        train_mean.append(mean)
+
+    return (np.array(lo), np.array(hi), np.array(bound_lo),
+            np.array(bound_hi), np.array(train_mean))
+
+
+class DriftSketch:
+    """
+    Fixed-memory streaming statistics for one subsystem's raw inputs.
+    Keeps per-feature counts, mean/variance (Chan's parallel update), min/max,
+    a fixed-bin histogram and out-of-training-range counts. Raw payloads are never stored.
+    """
+
+    def __init__(self, feature_names: List[str], defaults_dict: dict, n_bins: int = N_BINS):
+        self.feature_names = list(feature_names)
+        self.n_bins = n_bins
+        (self.lo, self.hi, self.bound_lo,
+         self.bound_hi, self.train_mean) = _feature_ranges(self.feature_names, defaults_dict)
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        d = len(self.feature_names)
+        with self._lock:
+            self.n_batches = 0
+            self.count = np.zeros(d, dtype=np.int64)
+            self.missing = np.zeros(d, dtype=np.int64)
+            self.mean = np.zeros(d)
+            self.m2 = np.zeros(d)
+            self.vmin = np.full(d, np.inf)
+            self.vmax = np.full(d, -np.inf)
+            self.out_of_range_low = np.zeros(d, dtype=np.int64)
+            self.out_of_range_high = np.zeros(d, dtype=np.int64)
+            self.hist = np.zeros((d, self.n_bins + 2), dtype=np.int64)
+
+    def update(self, x: np.ndarray):
+        """Fold a (n_rows, n_features) batch into the sketch. NaN marks a missing value."""
+        x = np.asarray(x, dtype=float)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        d = len(self.feature_names)
+        if x.shape[1] != d:
+            raise ValueError(f"Expected {d} features, got {x.shape[1]}")
+
+        valid = np.isfinite(x)
+        n_b = valid.sum(axis=0)
+        xz = np.where(valid, x, 0.0)
+        mean_b = np.divide(xz.sum(axis=0), n_b, out=np.zeros(d), where=n_b > 0)
+        m2_b = (np.where(valid, x - mean_b, 0.0) ** 2).sum(axis=0)
+
+        # Bin index per value: 0 = underflow, 1..n_bins = in range, n_bins+1 = overflow
+        scaled = (xz - self.lo) / (self.hi - self.lo) * self.n_bins
+        bins = np.clip(np.floor(scaled).astype(np.int64), -1, self.n_bins) + 1
+        flat = (np.arange(d) * (self.n_bins + 2) + bins)[valid]
+        hist_b = np.bincount(flat, minlength=d * (self.n_bins + 2)).reshape(d, -1)
+
+        low_b = ((x < self.bound_lo) & valid).sum(axis=0)
+        high_b = ((x > self.bound_hi) & valid).sum(axis=0)
+        min_b = np.where(valid, x, np.inf).min(axis=0)
+        max_b = np.where(valid, x, -np.inf).max(axis=0)
+
+        with self._lock:
+            n_a = self.count
+            n = n_a + n_b
+            delta = mean_b - self.mean
+            safe_n = np.maximum(n, 1)
+            self.mean = self.mean + delta * n_b / safe_n
+            self.m2 = self.m2 + m2_b + delta ** 2 * n_a * n_b / safe_n
+            self.count = n
+            self.missing += x.shape[0] - n_b
+            self.vmin = np.minimum(self.vmin, min_b)
+            self.vmax = np.maximum(self.vmax, max_b)
+            self.out_of_range_low += low_b
+            self.out_of_range_high += high_b
+            self.hist += hist_b
+            self.n_batches += 1
+
+    def snapshot(self) -> Dict:
+        """JSON-friendly summary of the sketch."""
+        with self._lock:
+            count = self.count.copy()
+            missing = self.missing.copy()
+            mean = self.mean.copy()
+            m2 = self.m2.copy()
+            vmin, vmax = self.vmin.copy(), self.vmax.copy()
+            low, high = self.out_of_range_low.copy(), self.out_of_range_high.copy()
+            hist = self.hist.copy()
+            n_batches = self.n_batches
+
+        features = {}
+        for i, f in enumerate(self.feature_names):
+            n = int(count[i])
+            span = self.hi[i] - self.lo[i]
+            features[f] = {
+                "count": n,
+                "missing": int(missing[i]),
+                "mean": float(mean[i]) if n else None,
+                "std": float(np.sqrt(m2[i] / (n - 1))) if n > 1 else None,
+                "min": float(vmin[i]) if n else None,
+                "max": float(vmax[i]) if n else None,
+                "train_mean": float(self.train_mean[i]),
+                # Shift of the live mean relative to the training range width
+                "mean_shift": float((mean[i] - self.train_mean[i]) / span) if n else None,
+                # Share of values below / above the training min / max
+                "out_of_range_rate_low": float(low[i] / n) if n else 0.0,
+                "out_of_range_rate_high": float(high[i] / n) if n else 0.0,
+                **_hist_quantiles(hist[i], self.lo[i], self.hi[i], self.n_bins),
+                "histogram": {
+                    "lo": float(self.lo[i]),
+                    "hi": float(self.hi[i]),
+                    "underflow": int(hist[i, 0]),
+                    "counts": hist[i, 1:-1].tolist(),
+                    "overflow": int(hist[i, -1]),
+                },
+            }
+        return {"batches": n_batches, "rows": int(count.max()) if len(count) else 0,
+                "features": features}
+
+
+def _hist_quantiles(hist, lo, hi, n_bins, qs=(0.05, 0.5, 0.95)):
+    """Approximate quantiles from a histogram; values outside [lo, hi] collapse onto the edges."""
+    total = hist.sum()
+    if total == 0:
+        return {f"p{int(q * 100)}": None for q in qs}
+    edges = np.concatenate(([lo], np.linspace(lo, hi, n_bins + 1), [hi]))
+    cum = np.concatenate(([0.0], np.cumsum(hist) / total))
+    out = {}
+    for q in qs:
+        j = int(np.searchsorted(cum, q, side="left"))
+        j = min(max(j, 1), len(hist))
+        frac = (q - cum[j - 1]) / max(cum[j] - cum[j - 1], 1e-12)
+        out[f"p{int(q * 100)}"] = float(edges[j - 1] + frac * (edges[j] - edges[j - 1]))
+    return out
+
+
+class DriftMonitor:
+    """One DriftSketch per subsystem, built lazily from feature_defaults.json."""
+
+    def __init__(self):
+        self._sketches = {}
+        self._lock = Lock()
+
+    def sketch(self, subsystem: str) -> DriftSketch:
+        if subsystem not in DRIFT_INPUTS:
+            raise ValueError(f"Unknown subsystem: {subsystem}")
+        if subsystem not in self._sketches:
+            with self._lock:
+                if subsystem not in self._sketches:
+                    fields, section = DRIFT_INPUTS[subsystem]
+                    self._sketches[subsystem] = DriftSketch(fields, FEATURE_DEFAULTS.get(section, {}))
+        return self._sketches[subsystem]
+
+    def observe(self, subsystem: str, x: np.ndarray):
+        """Record a raw input batch (rows in the subsystem's input field order)."""
+        self.sketch(subsystem).update(x)
+
+    def report(self, subsystem: str = None) -> Dict:
+        if subsystem is not None:
+            return self.sketch(subsystem).snapshot()
+        return {name: self.sketch(name).snapshot() for name in DRIFT_INPUTS}
+
+    def reset(self, subsystem: str = None):
+        for name in ([subsystem] if subsystem else list(DRIFT_INPUTS)):
+            self.sketch(name).reset()
+
+
+# Process-wide monitor used by the API
+DRIFT = DriftMonitor()
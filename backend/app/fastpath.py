@@ -0,0 +1,224 @@
+import email.message
+import json
+import numpy as np
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from pydantic.version import version_short
+
+from .inference import INPUT_FIELDS, INPUT_SCHEMAS
+from .schemas import EngineBatch, HydraulicsBatch, LandingGearBatch
+
+BATCH_SCHEMAS = {"engine": EngineBatch, "hydraulics": HydraulicsBatch, "landing_gear": LandingGearBatch}
+
+# ---------- Optional fast JSON ----------
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:  # plain json still works, just slower
+    orjson = None
+    FastJSONResponse = JSONResponse
+
+# ---------- Request parsing ----------
+# Bodies are decoded once and written straight into float arrays in INPUT_FIELDS order.
+# Anything the fast checks don't accept verbatim (strings, bools, missing fields, ints too
+# large for a float, non-JSON content types) is re-validated by the pydantic schema,
+# so coercions and 422 errors stay identical.
+
+
+def _is_number(v):
+    return type(v) is float or type(v) is int
+
+
+def _raise_validation(e: ValidationError, prefix=()):
+    errors = e.errors()
+    for err in errors:
+        err["loc"] = ("body", *prefix, *err["loc"])
+    raise RequestValidationError(errors)
+
+
+def _is_json(content_type):
+    """Same rule FastAPI uses: no header, application/json or application/*+json."""
+    if not content_type:
+        return True
+    message = email.message.Message()
+    message["content-type"] = content_type
+    if message.get_content_maintype() != "application":
+        return False
+    subtype = message.get_content_subtype()
+    return subtype == "json" or subtype.endswith("+json")
+
+
+def _raise_missing_body():
+    raise RequestValidationError([{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None,
+                                   "url": f"https://errors.pydantic.dev/{version_short()}/v/missing"}])
+
+
+def _decode(body: bytes, content_type=None):
+    """
+    Decode the body the way FastAPI does before validation: empty or null → missing, non-JSON
+    content types → the raw bytes (so the schema rejects them), malformed JSON → json_invalid.
+    orjson is tried first; bodies it refuses but json accepts (NaN, huge ints) fall back to json.
+    """
+    if not body:
+        _raise_missing_body()
+    if not _is_json(content_type):
+        return body
+    data = _loads_json(body)
+    if data is None:  # a JSON null body counts as no body, like FastAPI
+        _raise_missing_body()
+    return data
+
+
+def _loads_json(body: bytes):
+    if orjson is not None:
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            pass  # NaN, huge ints, ...: json decides, as in FastAPI's request.json()
+    try:
+        return json.loads(body)
+    except json.JSONDecodeError as e:
+        raise RequestValidationError([{"type": "json_invalid", "loc": ("body", e.pos),
+                                       "msg": "JSON decode error", "input": {}, "ctx": {"error": e.msg}}])
+
+
+def parse_item(subsystem: str, body: bytes, content_type: str = None) -> np.ndarray:
+    """Parse a single-item body into a (n_fields,) float array."""
+    fields = INPUT_FIELDS[subsystem]
+    out = np.empty(len(fields), dtype=float)
+    data = _decode(body, content_type)
+    if isinstance(data, dict):
+        try:
+            for i, f in enumerate(fields):
+                v = data[f]
+                if not _is_number(v):
+                    break
+                out[i] = v
+            else:
+                return out
+        except (KeyError, OverflowError):
+            pass
+
+    try:
+        item = INPUT_SCHEMAS[subsystem].model_validate(data, from_attributes=True)
+    except ValidationError as e:
+        _raise_validation(e)
+    out[:] = [getattr(item, f) for f in fields]
+    return out
+
+
+def _validate_rows(subsystem, rows, col_idx, width):
+    """Slow path for columnar payloads: per-row pydantic validation with precise error locations."""
+    fields = INPUT_FIELDS[subsystem]
+    schema = INPUT_SCHEMAS[subsystem]
+    if not isinstance(rows, list):
+        raise RequestValidationError([{"type": "list_type", "loc": ("body", "rows"),
+                                       "msg": "Input should be a valid list", "input": rows}])
+    out = np.empty((len(rows), len(fields)), dtype=float)
+    for r, row in enumerate(rows):
+        if not isinstance(row, list) or len(row) != width:
+            raise RequestValidationError([{
+                "type": "list_length", "loc": ("body", "rows", r),
+                "msg": f"Row should have {width} values", "input": row}])
+        try:
+            item = schema.model_validate({f: row[c] for f, c in zip(fields, col_idx)})
+        except ValidationError as e:
+            _raise_validation(e, ("rows", r))
+        out[r] = [getattr(item, f) for f in fields]
+    return out
+
+
+def _unit_ids(data, n_rows):
+    """Optional "unit_ids" list aligned with the rows (nulls allowed); None when absent."""
+    ids = data.get("unit_ids") if isinstance(data, dict) else None
+    if ids is None:
+        return None
+    if not isinstance(ids, list) or len(ids) != n_rows:
+        raise RequestValidationError([{
+            "type": "list_length", "loc": ("body", "unit_ids"),
+            "msg": f"unit_ids should be a list with one entry per row ({n_rows})", "input": ids}])
+    return [None if u is None else str(u) for u in ids]
+
+
+def parse_batch(subsystem: str, body: bytes, content_type: str = None):
+    """
+    Parse a batch body into a (n_rows, n_fields) float array plus optional per-row unit ids.
+    Accepts either
+      {"items": [{...}, ...]}                     (same shape as the *Batch schemas), or
+      {"fields": [...], "rows": [[...], ...]}     (array-of-arrays; "fields" defaults to schema order),
+    each with an optional "unit_ids": [...] list for the history store.
+    """
+    data = _decode(body, content_type)
+    rows = _parse_rows(subsystem, data)
+    return rows, _unit_ids(data, len(rows))
+
+
+def _parse_rows(subsystem, data):
+    fields = INPUT_FIELDS[subsystem]
+
+    if isinstance(data, dict) and "rows" in data:
+        names = data.get("fields", fields)
+        missing = [f for f in fields if not isinstance(names, list) or f not in names]
+        if missing:
+            raise RequestValidationError([{
+                "type": "missing", "loc": ("body", "fields"),
+                "msg": f"Field list is missing {missing}", "input": names}])
+        col_idx = [names.index(f) for f in fields]
+        rows = data["rows"]
+        try:
+            # Numeric (and bool, which pydantic also coerces) rows convert in one C pass;
+            # strings, nulls and ragged rows fall through to per-row validation
+            arr = np.asarray(rows)
+            if arr.dtype.kind in "biuf" and arr.ndim == 2 and arr.shape[1] == len(names):
+                return np.ascontiguousarray(arr[:, col_idx], dtype=float)
+            if arr.dtype.kind in "biuf" and arr.shape == (0,):
+                return np.empty((0, len(fields)))
+        except (TypeError, ValueError):
+            pass
+        return _validate_rows(subsystem, rows, col_idx, len(names))
+
+    if isinstance(data, dict) and isinstance(data.get("items"), list):
+        items = data["items"]
+        out = np.empty((len(items), len(fields)), dtype=float)
+        try:
+            for r, it in enumerate(items):
+                for i, f in enumerate(fields):
+                    v = it[f]
+                    if not _is_number(v):
+                        raise TypeError
+                    out[r, i] = v
+            return out
+        except (KeyError, TypeError, OverflowError):
+            pass
+
+    try:
+        batch = BATCH_SCHEMAS[subsystem].model_validate(data, from_attributes=True)
+    except ValidationError as e:
+        _raise_validation(e)
+    return np.array([[getattr(it, f) for f in fields] for it in batch.items], dtype=float).reshape(-1, len(fields))
+
+
+# ---------- OpenAPI ----------
+def item_body_schema(subsystem: str):
+    """openapi_extra documenting the JSON body that the raw-body endpoints parse themselves."""
+    return {"requestBody": {"required": True, "content": {"application/json": {
+        "schema": INPUT_SCHEMAS[subsystem].model_json_schema()}}}}
+
+
+def batch_body_schema(subsystem: str, with_unit_ids: bool = True):
+    item = INPUT_SCHEMAS[subsystem].model_json_schema()
+    by_items = {"items": {"type": "array", "items": item}}
+    by_rows = {
+        "fields": {"type": "array", "items": {"type": "string"}, "default": INPUT_FIELDS[subsystem]},
+        "rows": {"type": "array", "items": {"type": "array", "items": {"type": "number"}}},
+    }
+    if with_unit_ids:
+        by_items["unit_ids"] = by_rows["unit_ids"] = {
+            "type": "array", "items": {"type": ["string", "null"]},
+            "description": "Optional unit id per row; rows with an id are stored in the prediction history"}
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": {
+        "oneOf": [
+            {"type": "object", "required": ["items"], "properties": by_items},
+            {"type": "object", "required": ["rows"], "properties": by_rows},
+        ]}}}}}
@@ -0,0 +1,166 @@
+from pathlib import Path
+from threading import Thread, Lock
+import os
+import queue
+import sqlite3
+import time
+
+# ---------- Prediction history (SQLite) ----------
+HISTORY_DB = Path(os.getenv("RUL_HISTORY_DB", Path(__file__).parent.parent / "data" / "history.db"))
+BATCH_SIZE = 500          # max rows per transaction
+FLUSH_INTERVAL = 0.5      # seconds the writer waits before committing a partial batch
+MAX_QUEUE = 50_000        # pending rows; beyond this new rows are dropped, never blocked on
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    unit_id TEXT NOT NULL,
+    subsystem TEXT NOT NULL,
+    ts REAL NOT NULL,
+    predicted_rul REAL NOT NULL,
+    model_version TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_unit_sub_ts ON predictions (unit_id, subsystem, ts);
+"""
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")       # readers don't block the writer
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class HistoryStore:
+    """
+    Embedded prediction history. Request threads only enqueue rows; a single
+    background writer drains the queue and commits them in batches.
+    """
+
+    def __init__(self, path: Path = HISTORY_DB):
+        self.path = Path(path)
+        self._queue = queue.Queue(maxsize=MAX_QUEUE)
+        self._lock = Lock()
+        self._writer = None
+        self._ready = False
+        self.dropped = 0
+
+    def _ensure_schema(self):
+        if self._ready:
+            return
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        conn = _connect(self.path)
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+        self._ready = True
+
+    def start(self):
+        """Create the schema and start the writer (called from the API's startup hook)."""
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._ensure_schema()
+                self._writer = Thread(target=self._write_loop, name="history-writer", daemon=True)
+                self._writer.start()
+
+    def record(self, unit_id: str, subsystem: str, predicted_rul: float, model_version: str, ts: float = None):
+        """Queue one prediction; never blocks the caller."""
+        self.record_many([unit_id], subsystem, [predicted_rul], model_version, ts)
+
+    def record_many(self, unit_ids, subsystem: str, predicted_ruls, model_version: str, ts: float = None):
+        """Queue a batch of predictions sharing one timestamp; rows whose unit_id is None are skipped."""
+        if self._writer is None:
+            self.start()  # scripts/tests that never ran the startup hook
+        ts = ts if ts is not None else time.time()
+        for unit_id, rul in zip(unit_ids, predicted_ruls):
+            if unit_id is None:
+                continue
+            try:
+                self._queue.put_nowait((str(unit_id), subsystem, ts, float(rul), model_version))
+            except queue.Full:
+                self.dropped += 1
+
+    def _write_loop(self):
+        conn = _connect(self.path)
+        while True:
+            row = self._queue.get()
+            if row is None:
+                self._queue.task_done()
+                break
+            batch = [row]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            stop = False
+            while len(batch) < BATCH_SIZE:
+                try:
+                    nxt = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO predictions (unit_id, subsystem, ts, predicted_rul, model_version) "
+                        "VALUES (?, ?, ?, ?, ?)", batch)
+            except Exception as e:
+                print(f"[HISTORY ⚠️] Failed to write {len(batch)} rows: {e}")
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                break
+        conn.close()
+
+    def flush(self):
+        """Block until every queued row has been committed (shutdown / tests)."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+        self._writer = None
+
+    def trend(self, unit_id: str, subsystem: str, since: float = None, until: float = None, points: int = 200):
+        """
+        Downsampled RUL trend for one unit/subsystem: the [since, until] range is split
+        into `points` equal time buckets, each aggregated in SQL.
+        """
+        self._ensure_schema()
+        where = "unit_id = ? AND subsystem = ?"
+        args = [str(unit_id), subsystem]
+        if since is not None:
+            where += " AND ts >= ?"
+            args.append(since)
+        if until is not None:
+            where += " AND ts <= ?"
+            args.append(until)
+
+        conn = _connect(self.path)
+        try:
+            t0, t1, n = conn.execute(
+                f"SELECT MIN(ts), MAX(ts), COUNT(*) FROM predictions WHERE {where}", args).fetchone()
+            if not n:
+                return []
+            width = max((t1 - t0) / max(points, 1), 1e-9)
+            rows = conn.execute(
+                f"""
+                SELECT AVG(ts), AVG(predicted_rul), MIN(predicted_rul), MAX(predicted_rul), COUNT(*)
+                FROM predictions WHERE {where}
+                GROUP BY MIN(CAST((ts - ?) / ? AS INTEGER), ?)
+                ORDER BY 1
+                """, [*args, t0, width, points - 1]).fetchall()
+        finally:
+            conn.close()
+
+        return [
+            {"timestamp": ts, "predicted_rul": avg, "min_rul": lo, "max_rul": hi, "count": cnt}
+            for ts, avg, lo, hi, cnt in rows
+        ]
+
+
+# Process-wide store used by the API
+HISTORY = HistoryStore()
@@ -4,6 +4,7 @@ import numpy as np
 from typing import List
 from .schemas import EngineInput, HydraulicsInput, LandingGearInput
 from .models_loader import load_model
+from .windows import DEFAULT_WINDOWS, sequence_window_features
 
 # ---------- Load per-feature defaults ----------
 DEFAULTS_PATH = Path(__file__).parent.parent / "models" / "feature_defaults.json"
@@ -44,6 +45,21 @@ HYD_FEATURES: List[str] = [
 
 LG_FEATURES_TOP3: List[str] = ["load_during_landing", "tire_pressure", "speed_during_landing"]
 
+# Windowed engine model (retrain_engine_model.py with ENGINE_WINDOWS, /predict/engine/sequence):
+# trained only on what EngineInput carries (op settings + 3 sensors, no time_in_cycles), plus
+# rolling-window statistics of those sensors, so serving never feeds it imputed constants.
+ENGINE_SEQUENCE_FEATURES: List[str] = list(EngineInput.model_fields)
+ENGINE_WINDOW_FEATURES: List[str] = [f for f in ENGINE_SEQUENCE_FEATURES if f.startswith("sensor_")]
+
+# Raw request fields per subsystem (same keys as load_model), in schema order.
+# Batch/stream scoring passes rows around as float arrays with these columns.
+INPUT_SCHEMAS = {
+    "engine": EngineInput,
+    "hydraulics": HydraulicsInput,
+    "landing_gear": LandingGearInput,
+}
+INPUT_FIELDS = {name: list(schema.model_fields) for name, schema in INPUT_SCHEMAS.items()}
+
 # ---------- Safe imputation ----------
 def _impute_row(feature_names, values_dict, defaults_dict):
     """
@@ -105,10 +121,9 @@ def engine_to_array(item: EngineInput) -> np.ndarray:
 
 def hyd_to_array(payload):
     """Builds a full 65-feature array using smart correlations from limited frontend inputs."""
-    # Load feature defaults
-    with open(DEFAULTS_PATH, "r") as f:
-        defaults = json.load(f)["hyd"]
-        
+    # Feature defaults (read once at import)
+    defaults = FEATURE_DEFAULTS["hyd"]
+
 
     # Extract main user inputs
     vals = {
@@ -190,3 +205,91 @@ def lg_to_array(item: LandingGearInput) -> np.ndarray:
     print("-----------------------------\n")
 
     return x.ravel()
+
+
+def engine_row_to_array(row: np.ndarray) -> np.ndarray:
+    """engine_to_array for a parsed INPUT_FIELDS row (used off the request thread, e.g. by shadow jobs)."""
+    return engine_to_array(EngineInput.model_construct(**dict(zip(INPUT_FIELDS["engine"], map(float, row)))))
+
+
+# ---------- Batch helpers ----------
+# Vectorized, quiet versions of the per-item converters for (n_rows, n_fields) blocks
+# in INPUT_FIELDS order. Same features as hyd_to_array / lg_to_array, one NumPy pass per column.
+_HYD_COLUMN = {f: j for j, f in enumerate(FEATURE_DEFAULTS["hyd"])}
+_HYD_DEFAULT_ROW = np.array([v["mean"] if isinstance(v, dict) and "mean" in v else v
+                             for v in FEATURE_DEFAULTS["hyd"].values()], dtype=float)
+
+
+def hyd_rows_to_matrix(rows: np.ndarray) -> np.ndarray:
+    rows = np.asarray(rows, dtype=float).reshape(-1, len(INPUT_FIELDS["hydraulics"]))
+    n = len(rows)
+    vals = dict(zip(INPUT_FIELDS["hydraulics"], rows.T))
+
+    # One draw for all 14 noise columns instead of a uniform() call per column
+    draws = iter(np.random.random((14, n)))
+
+    def noise(lo, hi):
+        return lo + (hi - lo) * next(draws)
+
+    avg_temp = (vals["TS1_mean"] + vals["TS2_mean"] + vals["TS3_mean"] + vals["TS4_mean"]) / 4
+    vals["SE_mean"] = avg_temp * 1.15 + noise(-2, 2)
+    vals["TS5_mean"] = avg_temp * 0.97 + noise(-1, 1)
+    vals["TS6_mean"] = avg_temp * 1.05 + noise(-1, 1)
+
+    avg_ps = (vals["PS5_mean"] + vals["PS6_mean"]) / 2
+    for i in range(1, 6):
+        vals[f"PS{i}_mean"] = avg_ps * (0.9 + noise(-0.03, 0.03))
+
+    vals["FS1_mean"] = 5 + noise(-0.5, 0.5) + 0.002 * (avg_ps - 2500)
+    vals["FS2_mean"] = 8 + noise(-0.3, 0.3) + 0.0015 * (avg_ps - 2500)
+
+    vals["CE_std"] = np.abs(vals["CE_mean"] * 0.01 + noise(0, 0.05))
+    vals["CE_min"] = vals["CE_mean"] * 0.9
+    vals["CE_max"] = vals["CE_mean"] * 1.1
+
+    vals["CP_std"] = np.abs(vals["CP_mean"] * 0.02 + noise(0, 0.05))
+    vals["CP_min"] = vals["CP_mean"] * 0.9
+    vals["CP_max"] = vals["CP_mean"] * 1.1
+
+    vals["VS1_mean"] = noise(0.55, 0.75)
+    vals["VS1_std"] = noise(0.02, 0.08)
+    vals["VS1_min"] = vals["VS1_mean"] * 0.9
+    vals["VS1_max"] = vals["VS1_mean"] * 1.1
+
+    # Remaining columns are the constant defaults, in the order the model was trained with
+    x = np.tile(_HYD_DEFAULT_ROW, (n, 1))
+    for f, col in vals.items():
+        j = _HYD_COLUMN.get(f)
+        if j is not None:
+            x[:, j] = col
+    return np.clip(x * 1.5, 0, None)
+
+
+def lg_rows_to_matrix(rows: np.ndarray) -> np.ndarray:
+    rows = np.asarray(rows, dtype=float).reshape(-1, len(INPUT_FIELDS["landing_gear"]))
+    idx = [INPUT_FIELDS["landing_gear"].index(f) for f in LG_FEATURES_TOP3]
+    return np.ascontiguousarray(rows[:, idx])
+
+
+BATCH_CONVERTERS = {"hydraulics": hyd_rows_to_matrix, "landing_gear": lg_rows_to_matrix}
+
+
+def build_features(subsystem: str, rows: np.ndarray) -> np.ndarray:
+    """Model-ready feature matrix for a block of raw rows (locally served subsystems only)."""
+    if subsystem not in BATCH_CONVERTERS:
+        raise ValueError(f"No batch feature builder for {subsystem}")
+    return BATCH_CONVERTERS[subsystem](rows)
+
+
+def engine_sequence_to_array(rows: np.ndarray, windows=DEFAULT_WINDOWS) -> np.ndarray:
+    """
+    Unscaled feature row for the latest cycle of one engine's history: raw EngineInput rows
+    (oldest first) → ENGINE_SEQUENCE_FEATURES of the latest cycle followed by the rolling-window
+    stats, in the column order retrain_engine_model.py uses with ENGINE_WINDOWS.
+    No imputation or clamping: every column comes from the request.
+    """
+    rows = np.asarray(rows, dtype=float).reshape(-1, len(ENGINE_SEQUENCE_FEATURES))
+    if not len(rows):
+        raise ValueError("Engine history needs at least one cycle")
+    idx = [ENGINE_SEQUENCE_FEATURES.index(f) for f in ENGINE_WINDOW_FEATURES]
+    return np.concatenate([rows[-1], sequence_window_features(rows[:, idx], windows)])
@@ -1,21 +1,71 @@
 from pathlib import Path
 import numpy as np
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 import requests
+import joblib
+import time
+from functools import partial
+from typing import Literal, Optional
 HUGGINGFACE_ENGINE_API = "https://mihik12-aircraft-engine-rul.hf.space/predict/engine"
 
 from .schemas import (
     EngineInput, EngineBatch,
     HydraulicsInput, HydraulicsBatch,
     LandingGearInput, LandingGearBatch,
-    RULResponse, RULBatchResponse
+    RULResponse, RULBatchResponse,
+    ShadowRegistration
 )
 from .models_loader import load_model
-from .inference import engine_to_array, hyd_to_array, lg_to_array
+from .inference import engine_row_to_array, engine_sequence_to_array
+from .drift import DRIFT
+from .shadow import SHADOW
+from .tree_subsets import predict_tier
+from .history import HISTORY
+from .process_pool import MODEL_VERSIONS, POOL, score_rows
+from .inference import INPUT_FIELDS, ENGINE_SEQUENCE_FEATURES, ENGINE_WINDOW_FEATURES, build_features
+from .windows import window_feature_names
+from .fastpath import FastJSONResponse, parse_item, parse_batch, item_body_schema, batch_body_schema
 import pandas as pd
 import psutil, os
 
+def record_history(unit_id, subsystem, predicted_rul, model_version):
+    """Queue a prediction for the history store when the caller identified the unit."""
+    if unit_id is None:
+        return
+    try:
+        HISTORY.record(unit_id, subsystem, predicted_rul, model_version)
+    except Exception as e:
+        print(f"[HISTORY ⚠️] Could not queue {subsystem} prediction: {e}")
+
+
+def record_drift(subsystem, rows):
+    """Feed raw input rows to the drift monitor; never fails the prediction."""
+    try:
+        DRIFT.observe(subsystem, rows)
+    except Exception as e:
+        print(f"[DRIFT ⚠️] Could not record {subsystem} inputs: {e}")
+
+
+def subsystem_key(subsystem):
+    """Internal subsystem key for a path/query id; accepts the URL spelling too ("landing-gear")."""
+    key = subsystem.replace("-", "_")
+    if key not in INPUT_FIELDS:
+        raise HTTPException(status_code=404, detail=f"Unknown subsystem: {subsystem}")
+    return key
+
+
+def rul_response(y, version):
+    """RULResponse-shaped JSON rendered by the fast encoder."""
+    return FastJSONResponse({"predicted_rul": float(y), "units": "cycles", "model_version": version})
+
+
+def row_to_json(subsystem, row):
+    """Plain dict of an already-validated row, for forwarding."""
+    return dict(zip(INPUT_FIELDS[subsystem], map(float, row)))
+
+
 def log_memory(tag=""):
     """Logs current process memory usage in MB for debugging."""
     process = psutil.Process(os.getpid())
@@ -52,17 +102,24 @@ def health():
 
 
 # ---------- ENGINE ----------
-@app.post("/predict/engine", response_model=RULResponse)
-def predict_engine(payload: EngineInput):
+@app.post("/predict/engine", response_model=RULResponse, openapi_extra=item_body_schema("engine"))
+async def predict_engine(request: Request, unit_id: Optional[str] = Query(None)):
     """
     Forward Engine RUL prediction requests to Hugging Face Space.
     Keeps Render lightweight (no local model loading).
+    The Space always runs the full model, so there is no quality tier here.
     """
+    row = parse_item("engine", await request.body(), request.headers.get("content-type"))
+    return await run_in_threadpool(_predict_engine, row, unit_id)
+
+
+def _predict_engine(row, unit_id):
+    record_drift("engine", row)
     try:
         print("[FORWARD] Sending Engine RUL request to Hugging Face...")
         response = requests.post(
             HUGGINGFACE_ENGINE_API,
-            json=payload.model_dump(),
+            json=row_to_json("engine", row),
             timeout=30
         )
         response.raise_for_status()
@@ -73,26 +130,89 @@ def predict_engine(payload: EngineInput):
             raise ValueError(f"Invalid response from Hugging Face: {data}")
 
         print(f"[FORWARD ✅] Engine RUL received from HF → {y}")
-        return RULResponse(predicted_rul=y, model_version="HF_forward_proxy")
+        # Active time is the HF round trip, not a local predict, so no latency comparison
+        SHADOW.submit("engine", partial(engine_row_to_array, row), float(y))
+        record_history(unit_id, "engine", float(y), "HF_forward_proxy")
+        return rul_response(y, "HF_forward_proxy")
 
     except Exception as e:
         print(f"[FORWARD ❌] Hugging Face request failed: {e}")
         raise HTTPException(status_code=400, detail=f"Hugging Face proxy failed: {e}")
 
+# ---------- ENGINE (cycle history) ----------
+def load_windowed_engine():
+    """
+    (model, windows, scaler) trained by retrain_engine_model.py with ENGINE_WINDOWS.
+    Local files only (the HF Space serves the plain model); loaded once and cached.
+    """
+    if "engine_windowed" not in _model_cache:
+        model_path = MODELS_DIR / "best_model_fd001_windowed.joblib"
+        scaler_path = MODELS_DIR / "scaler_fd001_windowed.joblib"
+        if not model_path.exists() or not scaler_path.exists():
+            raise FileNotFoundError("No windowed engine model; run retrain_engine_model.py with ENGINE_WINDOWS set")
+        print("[CACHE] Loading windowed engine model into memory (one-time load)...")
+        bundle = joblib.load(model_path)
+        windows = tuple(bundle["windows"])
+        expected = ENGINE_SEQUENCE_FEATURES + window_feature_names(ENGINE_WINDOW_FEATURES, windows)
+        if bundle.get("features") != expected:
+            raise FileNotFoundError("Windowed engine model was trained on other columns; re-run "
+                                    "retrain_engine_model.py with ENGINE_WINDOWS set")
+        _model_cache["engine_windowed"] = (bundle["model"], windows, joblib.load(scaler_path))
+    return _model_cache["engine_windowed"]
+
+
+@app.post("/predict/engine/sequence", response_model=RULResponse, openapi_extra=batch_body_schema("engine", with_unit_ids=False))
+async def predict_engine_sequence(request: Request, quality: Literal["full", "fast"] = Query("full"),
+                                  unit_id: Optional[str] = Query(None)):
+    """
+    Engine RUL from a unit's recent cycles (oldest first, same payloads as /predict/engine),
+    using the windowed model: the latest cycle's inputs plus rolling mean/slope/EWMA of its sensors.
+    """
+    rows, _ = parse_batch("engine", await request.body(), request.headers.get("content-type"))
+    if not len(rows):
+        raise HTTPException(status_code=422, detail="Send at least one cycle")
+    return await run_in_threadpool(_predict_engine_sequence, rows, quality, unit_id)
+
+
+def _predict_engine_sequence(rows, quality, unit_id):
+    record_drift("engine", rows[-1:])  # earlier cycles were seen when they were current
+    try:
+        model, windows, scaler = load_windowed_engine()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    try:
+        x = scaler.transform(engine_sequence_to_array(rows, windows).reshape(1, -1))
+        y_pred, used = predict_tier(model, x, "engine_windowed", quality)
+        y = float(y_pred[0])
+        version = "best_model_fd001_windowed" if used == "full" else f"best_model_fd001_windowed:{used}"
+        record_history(unit_id, "engine", y, version)
+        return rul_response(y, version)
+
+    except Exception as e:
+        import traceback; traceback.print_exc()
+        raise HTTPException(status_code=400, detail=str(e))
+
 # ---------- HYDRAULICS ----------
-@app.post("/predict/hydraulics", response_model=RULResponse)
-def predict_hydraulics(payload: HydraulicsInput):
+@app.post("/predict/hydraulics", response_model=RULResponse, openapi_extra=item_body_schema("hydraulics"))
+async def predict_hydraulics(request: Request, unit_id: Optional[str] = Query(None)):
     """
     Stable, deterministic Hydraulics RUL prediction.
     ✅ Same input → exact same output (no floating variance)
     ✅ Includes clean scaling for visualization
+    No quality tier: there is no hydraulics training data to pick a tree subset on.
     """
+    row = parse_item("hydraulics", await request.body(), request.headers.get("content-type"))
+    return await run_in_threadpool(_predict_hydraulics, row, unit_id)
+
+
+def _predict_hydraulics(row, unit_id):
+    record_drift("hydraulics", row)
     try:
         import numpy as np
 
-        # Load model and prepare data
+        # Load model and prepare data (same features as hyd_to_array, straight from the parsed row)
         model = load_model("hydraulics", MODELS_DIR)
-        x = hyd_to_array(payload).reshape(1, -1)
+        x = build_features("hydraulics", row[None])
 
         # Debug info
         print("\n--- HYD DEBUG ---")
@@ -100,7 +220,9 @@ def predict_hydraulics(payload: HydraulicsInput):
         print("First 5 values:", x[0][:5])
 
         # Predict raw RUL
+        t0 = time.perf_counter()
         y_raw = float(model.predict(x)[0])
+        SHADOW.submit("hydraulics", x, y_raw, (time.perf_counter() - t0) * 1000)
         y_raw = round(y_raw, 4)  # 🧭 round to 4 decimals for stable math
         print(f"Predicted RUL (raw): {y_raw}")
         print("-----------------\n")
@@ -115,7 +237,8 @@ def predict_hydraulics(payload: HydraulicsInput):
 
         print(f"[HYD STABLE SCALE] raw={y_raw}, scaled={y_scaled}")
 
-        return RULResponse(predicted_rul=y_raw, model_version="agg_best_model")
+        record_history(unit_id, "hydraulics", y_raw, "agg_best_model")
+        return rul_response(y_raw, "agg_best_model")
 
     except Exception as e:
         import traceback
@@ -124,24 +247,174 @@ def predict_hydraulics(payload: HydraulicsInput):
 
 
 # ---------- LANDING GEAR ----------
-@app.post("/predict/landing-gear", response_model=RULResponse)
-def predict_landing_gear(payload: LandingGearInput):
+@app.post("/predict/landing-gear", response_model=RULResponse, openapi_extra=item_body_schema("landing_gear"))
+async def predict_landing_gear(request: Request, quality: Literal["full", "fast"] = Query("full"),
+                               unit_id: Optional[str] = Query(None)):
+    row = parse_item("landing_gear", await request.body(), request.headers.get("content-type"))
+    return await run_in_threadpool(_predict_landing_gear, row, quality, unit_id)
+
+
+def _predict_landing_gear(row, quality, unit_id):
+    record_drift("landing_gear", row)
     try:
         model = load_model("landing_gear", MODELS_DIR)
-        x = lg_to_array(payload).reshape(1, -1)
+        x = build_features("landing_gear", row[None])  # same features as lg_to_array
 
         # 🧠 Debug block
         print("\n--- LG DEBUG ---")
         print("Input:", x)
-        y = float(model.predict(x)[0])
+        t0 = time.perf_counter()
+        y_pred, used = predict_tier(model, x, "landing_gear", quality)
+        y = float(y_pred[0])
+        if used == "full":  # compare candidates against the full model only
+            SHADOW.submit("landing_gear", x, y, (time.perf_counter() - t0) * 1000)
         print("Predicted RUL:", y)
         print("----------------\n")
 
-        return RULResponse(predicted_rul=y, model_version="best_rul_model_top3")
+        version = "best_rul_model_top3" if used == "full" else f"best_rul_model_top3:{used}"
+        record_history(unit_id, "landing_gear", y, version)
+        return rul_response(y, version)
+
+    except Exception as e:
+        import traceback; traceback.print_exc()
+        raise HTTPException(status_code=400, detail=str(e))
 
+# ---------- BATCH SCORING ----------
+def _predict_batch(subsystem, parsed, quality, unit_id):
+    rows, unit_ids = parsed
+    record_drift(subsystem, rows)
+    try:
+        y, version = score_rows(subsystem, rows, quality)
     except Exception as e:
         import traceback; traceback.print_exc()
         raise HTTPException(status_code=400, detail=str(e))
+    if version == MODEL_VERSIONS[subsystem]:  # compare candidates against the full model only
+        SHADOW.submit_batch(subsystem, rows, y, partial(build_features, subsystem))
+    if unit_ids is None and unit_id is not None:
+        unit_ids = [unit_id] * len(y)  # one unit's readings, e.g. a sweep over its cycles
+    if unit_ids is not None:
+        try:
+            HISTORY.record_many(unit_ids, subsystem, y, version)
+        except Exception as e:
+            print(f"[HISTORY ⚠️] Could not queue {subsystem} batch: {e}")
+    return FastJSONResponse({"predictions": [
+        {"predicted_rul": v, "units": "cycles", "model_version": version} for v in y.tolist()
+    ]})
+
+
+@app.post("/predict/hydraulics/batch", response_model=RULBatchResponse, openapi_extra=batch_body_schema("hydraulics"))
+async def predict_hydraulics_batch(request: Request, unit_id: Optional[str] = Query(None)):
+    parsed = parse_batch("hydraulics", await request.body(), request.headers.get("content-type"))
+    return await run_in_threadpool(_predict_batch, "hydraulics", parsed, "full", unit_id)
+
+
+@app.post("/predict/landing-gear/batch", response_model=RULBatchResponse, openapi_extra=batch_body_schema("landing_gear"))
+async def predict_landing_gear_batch(request: Request, quality: Literal["full", "fast"] = Query("full"),
+                                     unit_id: Optional[str] = Query(None)):
+    parsed = parse_batch("landing_gear", await request.body(), request.headers.get("content-type"))
+    return await run_in_threadpool(_predict_batch, "landing_gear", parsed, quality, unit_id)
+
+
+@app.on_event("startup")
+def start_process_pool():
+    if POOL is not None:
+        POOL.start()
+
+
+@app.on_event("startup")
+def start_history_writer():
+    """Create the history schema and writer thread before the first request arrives."""
+    try:
+        HISTORY.start()
+    except Exception as e:
+        print(f"[HISTORY ⚠️] Could not start history writer: {e}")
+
+
+@app.on_event("shutdown")
+def stop_process_pool():
+    if POOL is not None:
+        POOL.shutdown()
+    SHADOW.shutdown()
+
+
+# ---------- INPUT DRIFT ----------
+@app.get("/drift")
+def drift_report():
+    """Streaming input statistics for all subsystems (no raw payloads are kept)."""
+    return DRIFT.report()
+
+
+@app.get("/drift/{subsystem}")
+def drift_report_subsystem(subsystem: str):
+    return DRIFT.report(subsystem_key(subsystem))
+
+
+@app.delete("/drift")
+def drift_reset(subsystem: str = None):
+    if subsystem is not None:
+        subsystem = subsystem_key(subsystem)
+    DRIFT.reset(subsystem)
+    return {"status": "reset", "subsystem": subsystem or "all"}
+
+
+# ---------- SHADOW EVALUATION ----------
+@app.post("/shadow/{subsystem}")
+def shadow_register(subsystem: str, payload: ShadowRegistration):
+    """
+    Register a candidate model (a .joblib file in backend/models/) next to the active one.
+    Sampled requests are re-scored by the candidate in a separate low-priority process.
+    """
+    subsystem = subsystem_key(subsystem)
+    path = MODELS_DIR / Path(payload.model_file).name
+    if not path.exists():
+        raise HTTPException(status_code=404, detail=f"Model file not found: {path.name}")
+    try:
+        SHADOW.register(subsystem, path, payload.version or path.stem, payload.sample_rate)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not load candidate: {e}")
+    return {"status": "registered", "subsystem": subsystem, "candidate_version": payload.version or path.stem}
+
+
+@app.get("/shadow")
+def shadow_report():
+    """Prediction deltas and latency percentiles of each candidate vs the active model."""
+    return SHADOW.report()
+
+
+@app.delete("/shadow/{subsystem}")
+def shadow_unregister(subsystem: str):
+    if not SHADOW.unregister(subsystem_key(subsystem)):
+        raise HTTPException(status_code=404, detail=f"No shadow model for {subsystem}")
+    return {"status": "removed", "subsystem": subsystem}
+
+
+# ---------- PREDICTION HISTORY ----------
+@app.get("/history")
+def history(
+    unit_id: str,
+    subsystem: str,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    points: int = Query(200, ge=1, le=5000),
+):
+    """
+    Downsampled RUL trend of stored predictions (timestamps are Unix seconds).
+    `subsystem` takes the frontend/URL id ("landing-gear") or the internal key ("landing_gear").
+    """
+    key = subsystem_key(subsystem)
+    return {
+        "unit_id": unit_id,
+        "subsystem": key.replace("_", "-"),  # frontend SubsystemId
+        "points": HISTORY.trend(unit_id, key, since, until, points),
+    }
+
+
+@app.on_event("shutdown")
+def flush_history():
+    HISTORY.flush()
+    HISTORY.close()
+
+
 # ---------- ROOT / HOME ----------
 @app.get("/")
 def root():
@@ -0,0 +1,187 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+import math
+import os
+
+import numpy as np
+
+from .inference import INPUT_FIELDS, BATCH_CONVERTERS, build_features
+from .models_loader import load_model
+from .shadow import _limit_threads
+from .tree_subsets import predict_tier
+
+# ---------- Process-pool batch scoring ----------
+# Off by default (Render's 512MB can't hold a model copy per process).
+# Set RUL_PROCESS_WORKERS=N to pre-fork N workers at startup.
+PROCESS_WORKERS = int(os.getenv("RUL_PROCESS_WORKERS", "0"))
+PRELOAD_SUBSYSTEMS = [s for s in os.getenv("RUL_PROCESS_PRELOAD", "hydraulics,landing_gear").split(",") if s]
+MIN_POOL_ROWS = 512       # smaller batches are scored in-process
+MIN_BLOCK_ROWS = 256      # rows per worker task
+WARMUP_TIMEOUT = 300      # seconds for every worker to load its models at startup
+
+# Engine isn't here: it is served by the Hugging Face Space, and loading the forest
+# locally (uncached) per batch doesn't fit in Render's memory.
+MODEL_VERSIONS = {
+    "hydraulics": "agg_best_model",
+    "landing_gear": "best_rul_model_top3",
+}
+
+
+def _model_version(subsystem, tier):
+    base = MODEL_VERSIONS[subsystem]
+    return base if tier == "full" else f"{base}:{tier}"
+
+
+def _predict_rows(model, subsystem, rows, quality):
+    x = build_features(subsystem, rows)
+    y, used = predict_tier(model, x, subsystem, quality)
+    y = np.asarray(y, dtype=float)
+    if subsystem == "hydraulics":
+        y = np.round(y, 4)  # same stable rounding as /predict/hydraulics
+    return y, used
+
+
+def score_rows_local(subsystem: str, rows: np.ndarray, quality: str = "full"):
+    """Score raw rows in this process. Returns (predictions, model_version)."""
+    y, used = _predict_rows(load_model(subsystem), subsystem, rows, quality)
+    return y, _model_version(subsystem, used)
+
+
+# ---------- Worker side ----------
+_worker_models = {}
+
+
+def _worker_model(subsystem):
+    # One process per core already, so each model runs single-threaded
+    if subsystem not in _worker_models:
+        _worker_models[subsystem] = _limit_threads(load_model(subsystem))
+    return _worker_models[subsystem]
+
+
+def _init_worker(subsystems, ready, go):
+    try:
+        for name in subsystems:
+            _worker_model(name)
+    except Exception as e:
+        ready.put((os.getpid(), repr(e)))
+        raise
+    print(f"[POOL] Worker {os.getpid()} ready with {list(_worker_models)}")
+    ready.put((os.getpid(), None))
+    # Stay busy until every worker has reported, so each warm-up task spawns a new process
+    go.wait()
+
+
+def _ping():
+    return os.getpid()
+
+
+def _score_block(subsystem, quality, in_name, out_name, n_rows, n_cols, start, stop):
+    """Read rows [start, stop) from the input buffer and write predictions to the output buffer."""
+    model = _worker_model(subsystem)
+    shm_in = shared_memory.SharedMemory(name=in_name)
+    shm_out = shared_memory.SharedMemory(name=out_name)
+    try:
+        rows = np.ndarray((n_rows, n_cols), dtype=np.float64, buffer=shm_in.buf)[start:stop]
+        out = np.ndarray((n_rows,), dtype=np.float64, buffer=shm_out.buf)
+        y, used = _predict_rows(model, subsystem, rows, quality)
+        out[start:stop] = y
+        del rows, out
+    finally:
+        shm_in.close()
+        shm_out.close()
+    return used
+
+
+# ---------- Parent side ----------
+class InferencePool:
+    """
+    Pre-spawned worker processes that keep their own model copies. Row blocks are
+    exchanged through shared-memory buffers (only names and offsets are pickled) and
+    each worker writes its predictions into its own slice of the output, so order is preserved.
+    """
+
+    def __init__(self, workers: int, preload=None):
+        self.workers = workers
+        self.preload = list(preload or [])
+        self._executor = None
+
+    @property
+    def running(self):
+        return self._executor is not None
+
+    def start(self):
+        if self._executor is not None:
+            return
+        # spawn (not fork): the API process already runs background threads
+        ctx = get_context("spawn")
+        ready, go = ctx.Queue(), ctx.Event()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self.preload, ready, go),
+        )
+        # Start every worker now so model loading doesn't land on the first batch.
+        # Workers block in the initializer until all have reported, so none of the
+        # pings can be picked up by an already-warm worker.
+        pings = [self._executor.submit(_ping) for _ in range(self.workers)]
+        try:
+            pids = set()
+            for _ in range(self.workers):
+                pid, error = ready.get(timeout=WARMUP_TIMEOUT)
+                if error is not None:
+                    raise RuntimeError(f"worker {pid}: {error}")
+                pids.add(pid)
+            go.set()
+            for f in pings:
+                f.result(timeout=WARMUP_TIMEOUT)
+        except Exception as e:
+            print(f"[POOL ⚠️] Workers failed to start, scoring batches in-process: {e!r}")
+            go.set()
+            self.shutdown()
+            return
+        print(f"[POOL] Started {len(pids)} inference workers")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def score(self, subsystem: str, rows: np.ndarray, quality: str = "full"):
+        """Score raw rows across the workers. Returns (predictions, model_version)."""
+        rows = np.ascontiguousarray(rows, dtype=np.float64)
+        n_rows, n_cols = rows.shape
+        shm_in = shared_memory.SharedMemory(create=True, size=max(rows.nbytes, 1))
+        shm_out = shared_memory.SharedMemory(create=True, size=max(n_rows * 8, 1))
+        try:
+            np.ndarray(rows.shape, dtype=np.float64, buffer=shm_in.buf)[:] = rows
+            block = max(MIN_BLOCK_ROWS, math.ceil(n_rows / self.workers))
+            futures = [
+                self._executor.submit(_score_block, subsystem, quality, shm_in.name, shm_out.name,
+                                      n_rows, n_cols, start, min(start + block, n_rows))
+                for start in range(0, n_rows, block)
+            ]
+            used = {f.result() for f in futures}
+            y = np.ndarray((n_rows,), dtype=np.float64, buffer=shm_out.buf).copy()
+        finally:
+            shm_in.close()
+            shm_in.unlink()
+            shm_out.close()
+            shm_out.unlink()
+        # All blocks fall back to the full model together, so `used` has a single value
+        return y, _model_version(subsystem, used.pop() if len(used) == 1 else "full")
+
+
+POOL = InferencePool(PROCESS_WORKERS, PRELOAD_SUBSYSTEMS) if PROCESS_WORKERS > 0 else None
+
+
+def score_rows(subsystem: str, rows: np.ndarray, quality: str = "full"):
+    """Batch entry point: large batches go to the process pool when it's enabled."""
+    if subsystem not in BATCH_CONVERTERS:
+        raise ValueError(f"Batch scoring is not available for {subsystem}")
+    rows = np.asarray(rows, dtype=float).reshape(-1, len(INPUT_FIELDS[subsystem]))
+    if not len(rows):
+        return np.empty(0), MODEL_VERSIONS[subsystem]
+    if POOL is not None and POOL.running and len(rows) >= MIN_POOL_ROWS:
+        return POOL.score(subsystem, rows, quality)
+    return score_rows_local(subsystem, rows, quality)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 # ---------- Input Models ----------
 class EngineInput(BaseModel):
@@ -43,3 +43,11 @@ class RULResponse(BaseModel):
 
 class RULBatchResponse(BaseModel):
     predictions: List[RULResponse]
+
+# ---------- Shadow evaluation ----------
+class ShadowRegistration(BaseModel):
+    model_config = {"protected_namespaces": ()}
+
+    model_file: str
+    version: Optional[str] = None
+    sample_rate: float = Field(0.1, ge=0.0, le=1.0)
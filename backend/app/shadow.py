@@ -0,0 +1,291 @@
+from collections import deque
+from concurrent.futures import Future
+from functools import partial
+from itertools import count
+from multiprocessing import get_context
+from pathlib import Path
+from threading import Lock, Thread
+import os
+import queue
+import random
+import time
+
+import joblib
+import numpy as np
+
+MAX_PENDING = 64         # queued shadow jobs; extra samples are dropped, never waited on
+MAX_BATCH_SAMPLE = 256   # sampled rows sent per batch request
+LATENCY_WINDOW = 1000    # recent latencies kept per candidate for percentiles
+REGISTER_TIMEOUT = 120   # seconds to wait for the shadow process to load a candidate
+
+
+def _limit_threads(model):
+    """Keep candidates single-threaded so they can't compete with the active model for cores."""
+    try:
+        params = {k: 1 for k in model.get_params() if k == "n_jobs" or k.endswith("__n_jobs")}
+        if params:
+            model.set_params(**params)
+    except Exception:
+        pass
+    return model
+
+
+def load_candidate(path: Path):
+    """Load a candidate model from disk, unwrapping dict-wrapped models like load_model does."""
+    loaded = joblib.load(path)
+    if isinstance(loaded, dict) and "model" in loaded:
+        loaded = loaded["model"]
+    return _limit_threads(loaded)
+
+
+class ShadowCandidate:
+    """Running comparison stats of a candidate against the active model (kept in the API process)."""
+
+    def __init__(self, cand_id: int, version: str, sample_rate: float):
+        self.cand_id = cand_id
+        self.version = version
+        self.sample_rate = sample_rate
+        self.registered_at = time.time()
+        self._lock = Lock()
+        self.n = 0
+        self.errors = 0
+        self.dropped = 0
+        self.sum_delta = 0.0
+        self.sum_abs_delta = 0.0
+        self.max_abs_delta = 0.0
+        self.active_ms = deque(maxlen=LATENCY_WINDOW)
+        self.candidate_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, active_rul, candidate_rul, active_ms, candidate_ms):
+        """
+        active_rul/candidate_rul may be arrays (batch samples). Latencies are only kept for
+        single-row samples; active_ms is None when it isn't a local predict time (engine's HF round trip).
+        """
+        delta = np.asarray(candidate_rul, dtype=float) - np.asarray(active_rul, dtype=float)
+        with self._lock:
+            self.n += delta.size
+            self.sum_delta += float(delta.sum())
+            self.sum_abs_delta += float(np.abs(delta).sum())
+            self.max_abs_delta = max(self.max_abs_delta, float(np.abs(delta).max(initial=0.0)))
+            if delta.size == 1:
+                if active_ms is not None:
+                    self.active_ms.append(active_ms)
+                self.candidate_ms.append(candidate_ms)
+
+    def count_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def count_dropped(self):
+        with self._lock:
+            self.dropped += 1
+
+    def report(self):
+        with self._lock:
+            n = self.n
+            active = np.array(self.active_ms)
+            cand = np.array(self.candidate_ms)
+            out = {
+                "candidate_version": self.version,
+                "sample_rate": self.sample_rate,
+                "registered_at": self.registered_at,
+                "compared": n,
+                "errors": self.errors,
+                "dropped": self.dropped,
+                "mean_delta": self.sum_delta / n if n else None,
+                "mean_abs_delta": self.sum_abs_delta / n if n else None,
+                "max_abs_delta": self.max_abs_delta if n else None,
+            }
+
+        def pct(a):
+            if not len(a):
+                return {"p50_ms": None, "p95_ms": None}
+            return {"p50_ms": float(np.percentile(a, 50)), "p95_ms": float(np.percentile(a, 95))}
+
+        out["active_latency"] = pct(active)
+        out["candidate_latency"] = pct(cand)
+        return out
+
+
+# ---------- Shadow process ----------
+def _shadow_main(jobs, results):
+    """
+    Runs in its own low-priority process: loads candidates and scores sampled inputs,
+    so candidate CPU time never holds the API process's GIL.
+    """
+    try:
+        os.nice(19)
+    except (AttributeError, OSError):
+        pass
+    models = {}  # subsystem -> (cand_id, model)
+    while True:
+        msg = jobs.get()
+        if msg is None:
+            break
+        kind, subsystem, cand_id = msg[:3]
+        if kind == "register":
+            try:
+                models[subsystem] = (cand_id, load_candidate(msg[3]))
+                results.put(("registered", subsystem, cand_id, None))
+            except Exception as e:
+                results.put(("registered", subsystem, cand_id, f"{type(e).__name__}: {e}"))
+        elif kind == "unregister":
+            if models.get(subsystem, (None,))[0] == cand_id:
+                del models[subsystem]
+        elif kind == "score":
+            current = models.get(subsystem)
+            if current is None or current[0] != cand_id:
+                continue  # candidate was replaced while the job was queued
+            x, active_rul, active_ms = msg[3:]
+            try:
+                if callable(x):
+                    x = x()
+                x = np.asarray(x, dtype=float).reshape(1, -1) if np.ndim(x) == 1 else x
+                t0 = time.perf_counter()
+                y = np.asarray(current[1].predict(x), dtype=float)
+                results.put(("result", subsystem, cand_id, (active_rul, y, active_ms, (time.perf_counter() - t0) * 1000)))
+            except Exception as e:
+                results.put(("error", subsystem, cand_id, f"{type(e).__name__}: {e}"))
+
+
+class ShadowEvaluator:
+    """
+    Scores a sample of live inputs with registered candidates in a separate, niced
+    process (started on the first registration). The request thread only does a random
+    draw and a non-blocking enqueue; when the queue is full the sample is dropped.
+    Stats are aggregated here from the results the shadow process sends back.
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING):
+        self.max_pending = max_pending
+        self._candidates = {}
+        self._ids = count(1)
+        self._lock = Lock()
+        self._pending = {}   # cand_id -> Future for the registration reply
+        self._process = None
+        self._jobs = None
+        self._results = None
+        self._collector = None
+
+    @property
+    def running(self):
+        return self._process is not None and self._process.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            if self._process is not None:
+                print("[SHADOW ⚠️] Shadow process exited; dropping its candidates")
+                self._candidates.clear()
+            # spawn (not fork): the API process already runs background threads
+            ctx = get_context("spawn")
+            self._jobs = ctx.Queue(self.max_pending)
+            self._results = ctx.Queue()
+            self._process = ctx.Process(target=_shadow_main, args=(self._jobs, self._results),
+                                        name="shadow", daemon=True)
+            self._process.start()
+            self._collector = Thread(target=self._collect, args=(self._results,),
+                                     name="shadow-collector", daemon=True)
+            self._collector.start()
+            print(f"[SHADOW] Started shadow process {self._process.pid}")
+
+    def shutdown(self):
+        with self._lock:
+            if self._process is None:
+                return
+            try:
+                self._jobs.put(None, timeout=5)
+                self._process.join(timeout=10)
+            except Exception:
+                pass
+            if self._process.is_alive():
+                self._process.terminate()
+            self._results.put(None)
+            self._process = None
+
+    def _collect(self, results):
+        while True:
+            msg = results.get()
+            if msg is None:
+                break
+            kind, subsystem, cand_id, data = msg
+            if kind == "registered":
+                fut = self._pending.pop(cand_id, None)
+                if fut is not None:
+                    fut.set_result(data)
+                continue
+            cand = self._candidates.get(subsystem)
+            if cand is None or cand.cand_id != cand_id:
+                continue
+            if kind == "result":
+                cand.record(*data)
+            else:
+                cand.count_error()
+                print(f"[SHADOW ⚠️] {cand.version} failed: {data}")
+
+    def register(self, subsystem: str, path: Path, version: str, sample_rate: float = 0.1):
+        """Load the candidate in the shadow process; raises RuntimeError if it can't be loaded."""
+        self.start()
+        cand_id = next(self._ids)
+        fut = self._pending[cand_id] = Future()
+        self._jobs.put(("register", subsystem, cand_id, str(path)), timeout=REGISTER_TIMEOUT)
+        try:
+            error = fut.result(timeout=REGISTER_TIMEOUT)
+        except Exception:
+            self._pending.pop(cand_id, None)
+            raise RuntimeError("Shadow process did not answer")
+        if error is not None:
+            raise RuntimeError(error)
+        self._candidates[subsystem] = ShadowCandidate(cand_id, version, sample_rate)
+        print(f"[SHADOW] Registered {version} for {subsystem} (sample_rate={sample_rate})")
+
+    def unregister(self, subsystem: str):
+        cand = self._candidates.pop(subsystem, None)
+        if cand is None:
+            return False
+        try:
+            self._jobs.put_nowait(("unregister", subsystem, cand.cand_id))
+        except queue.Full:
+            pass  # queued jobs for it are skipped by id anyway
+        return True
+
+    def _enqueue(self, subsystem, cand, x, active_rul, active_ms):
+        if not self.running:
+            cand.count_dropped()
+            return
+        try:
+            self._jobs.put_nowait(("score", subsystem, cand.cand_id, x, active_rul, active_ms))
+        except queue.Full:
+            cand.count_dropped()
+
+    def submit(self, subsystem: str, x, active_rul: float, active_ms: float = None):
+        """
+        Queue a shadow comparison of one request. `x` is the active model's feature matrix,
+        or a picklable zero-arg callable building it in the shadow process.
+        Pass active_ms=None when the active latency isn't a local predict time.
+        """
+        cand = self._candidates.get(subsystem)
+        if cand is None or random.random() >= cand.sample_rate:
+            return
+        self._enqueue(subsystem, cand, x, active_rul, active_ms)
+
+    def submit_batch(self, subsystem: str, rows: np.ndarray, active_ruls: np.ndarray, to_features):
+        """
+        Sample rows of a batch (each with probability sample_rate, at most MAX_BATCH_SAMPLE)
+        and queue them as one job; `to_features(rows)` runs in the shadow process.
+        """
+        cand = self._candidates.get(subsystem)
+        if cand is None or not len(rows):
+            return
+        idx = np.flatnonzero(np.random.random(len(rows)) < cand.sample_rate)[:MAX_BATCH_SAMPLE]
+        if len(idx):
+            self._enqueue(subsystem, cand, partial(to_features, rows[idx]),
+                          np.asarray(active_ruls, dtype=float)[idx], None)
+
+    def report(self):
+        return {name: cand.report() for name, cand in list(self._candidates.items())}
+
+
+# Process-wide evaluator used by the API
+SHADOW = ShadowEvaluator()
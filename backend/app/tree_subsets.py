@@ -0,0 +1,161 @@
+from pathlib import Path
+from weakref import WeakKeyDictionary
+import hashlib
+import json
+import numpy as np
+
+# ---------- Quality tiers ----------
+# "full" evaluates every tree; other tiers evaluate a subset chosen offline by the
+# training scripts (greedy forward selection on held-out data) and stored in tree_subsets.json.
+QUALITY_TIERS = ("full", "fast")
+TIER_FRACTIONS = {"fast": 0.125}  # share of the forest kept per tier (200 → 25, 300 → 38 trees)
+
+SUBSETS_PATH = Path(__file__).parent.parent / "models" / "tree_subsets.json"
+_subsets_cache = {}
+_fingerprints = WeakKeyDictionary()  # forest -> fingerprint, computed once per loaded model
+_warned = set()
+
+
+def split_forest(model):
+    """
+    Return (preprocess, forest) for a tree ensemble, or (None, None) if the model isn't one.
+    Pipelines are split into their preprocessing steps and final forest.
+    """
+    preprocess = None
+    forest = model
+    if hasattr(model, "steps"):
+        preprocess = model[:-1] if len(model.steps) > 1 else None
+        forest = model.steps[-1][1]
+    if not hasattr(forest, "estimators_") or not hasattr(forest, "n_outputs_"):
+        return None, None
+    return preprocess, forest
+
+
+def forest_fingerprint(forest) -> str:
+    """Short hash of the trees' split features and thresholds; changes whenever the forest is retrained."""
+    fp = _fingerprints.get(forest)
+    if fp is None:
+        h = hashlib.sha1()
+        for est in forest.estimators_:
+            h.update(est.tree_.feature.tobytes())
+            h.update(est.tree_.threshold.tobytes())
+        fp = _fingerprints[forest] = h.hexdigest()[:16]
+    return fp
+
+
+def _forest_input(preprocess, x):
+    if preprocess is not None:
+        x = preprocess.transform(x)
+    # Trees are fitted on float32; this matches what forest.predict does internally
+    return np.ascontiguousarray(x, dtype=np.float32)
+
+
+def per_tree_predictions(model, X) -> np.ndarray:
+    """Predictions of every tree in the forest, shape (n_trees, n_rows)."""
+    preprocess, forest = split_forest(model)
+    if forest is None:
+        raise ValueError(f"Not a tree ensemble: {type(model).__name__}")
+    x = _forest_input(preprocess, X)
+    return np.stack([est.predict(x, check_input=False) for est in forest.estimators_])
+
+
+def select_tree_subset(per_tree: np.ndarray, y, k: int):
+    """
+    Greedy forward selection: repeatedly add the tree whose inclusion gives the lowest
+    MAE of the subset mean against y. Vectorized over all candidate trees per step.
+    """
+    y = np.asarray(y, dtype=float)
+    n_trees = per_tree.shape[0]
+    k = max(1, min(k, n_trees))
+    chosen = []
+    used = np.zeros(n_trees, dtype=bool)
+    acc = np.zeros_like(y)
+    for step in range(k):
+        err = np.abs((acc + per_tree) / (step + 1) - y).mean(axis=1)
+        err[used] = np.inf
+        j = int(np.argmin(err))
+        chosen.append(j)
+        used[j] = True
+        acc += per_tree[j]
+    return chosen
+
+
+def build_tiers(model, X_val, y_val):
+    """
+    Choose tree subsets for every non-full tier and report their accuracy cost.
+    Trees are selected on the even rows of the held-out data and the MAE is reported
+    on the odd rows, so the reported cost isn't biased by the selection.
+    Returns a dict ready to be stored with save_tiers().
+    """
+    per_tree = per_tree_predictions(model, X_val)
+    fingerprint = forest_fingerprint(split_forest(model)[1])
+    y = np.asarray(y_val, dtype=float)
+    pick = np.arange(len(y)) % 2 == 0
+    rep = ~pick
+    mae_full = float(np.abs(per_tree[:, rep].mean(axis=0) - y[rep]).mean())
+    tiers = {}
+    for tier, frac in TIER_FRACTIONS.items():
+        k = max(1, int(round(per_tree.shape[0] * frac)))
+        trees = select_tree_subset(per_tree[:, pick], y[pick], k)
+        mae_tier = float(np.abs(per_tree[trees][:, rep].mean(axis=0) - y[rep]).mean())
+        tiers[tier] = {
+            "trees": trees,
+            "n_trees": len(trees),
+            "n_trees_full": int(per_tree.shape[0]),
+            "fingerprint": fingerprint,
+            "mae_full": mae_full,
+            "mae_tier": mae_tier,
+            "mae_increase": mae_tier - mae_full,
+        }
+    return tiers
+
+
+def print_tier_report(name, tiers):
+    print(f"\n⚡ Quality tiers for {name}:")
+    for tier, info in tiers.items():
+        print(f"  {tier}: {info['n_trees']}/{info['n_trees_full']} trees → "
+              f"MAE {info['mae_tier']:.2f} vs full {info['mae_full']:.2f} "
+              f"({info['mae_increase']:+.2f})")
+
+
+def save_tiers(name, tiers, path: Path = SUBSETS_PATH):
+    """Merge one model's tiers into tree_subsets.json."""
+    existing = json.loads(path.read_text()) if path.exists() else {}
+    existing[name] = tiers
+    path.parent.mkdir(exist_ok=True, parents=True)
+    path.write_text(json.dumps(existing, indent=2))
+    _subsets_cache.clear()
+    _warned.clear()
+    print(f"💾 Saved {name} tree subsets to: {path}")
+
+
+def load_tiers(name):
+    if "all" not in _subsets_cache:
+        try:
+            _subsets_cache["all"] = json.loads(SUBSETS_PATH.read_text()) if SUBSETS_PATH.exists() else {}
+        except Exception as e:
+            print(f"[TIERS ⚠️] Could not read {SUBSETS_PATH.name}: {e}")
+            _subsets_cache["all"] = {}
+    return _subsets_cache["all"].get(name, {})
+
+
+def predict_tier(model, x, name, tier="full"):
+    """
+    Predict with the requested quality tier.
+    Returns (predictions, tier actually used); falls back to the full model when
+    the model isn't a forest or the stored subset wasn't built from this exact forest.
+    """
+    if tier != "full":
+        info = load_tiers(name).get(tier)
+        preprocess, forest = split_forest(model)
+        if (info and forest is not None
+                and info.get("n_trees_full") == len(forest.estimators_)
+                and info.get("fingerprint") == forest_fingerprint(forest)):
+            xf = _forest_input(preprocess, x)
+            preds = [forest.estimators_[i].predict(xf, check_input=False) for i in info["trees"]]
+            return np.mean(preds, axis=0), tier
+        if (name, tier) not in _warned:
+            _warned.add((name, tier))
+            print(f"[TIERS ⚠️] No {tier} subset matching the loaded {name} model; serving the full model "
+                  f"(run build_tree_subsets.py / the retrain script to create one)")
+    return model.predict(x), "full"
@@ -0,0 +1,89 @@
+from pathlib import Path
+from typing import List, Sequence
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# ---------- Rolling-window features ----------
+# For every row and window size k: mean, least-squares slope per cycle and a
+# k-cycle EWMA of each feature over the unit's last k cycles (fewer at the start of a unit).
+DEFAULT_WINDOWS = (5, 10, 20)
+EWM_ALPHA = 0.3
+STATS = ("mean", "slope", "ewm")
+
+
+def window_feature_names(feature_names: Sequence[str], windows=DEFAULT_WINDOWS) -> List[str]:
+    return [f"{f}_{stat}_{k}" for k in windows for stat in STATS for f in feature_names]
+
+
+def _position_in_unit(units: np.ndarray) -> np.ndarray:
+    """0-based cycle index of each row within its unit (rows must be grouped by unit)."""
+    n = len(units)
+    starts = np.r_[0, np.flatnonzero(units[1:] != units[:-1]) + 1]
+    lengths = np.diff(np.r_[starts, n])
+    return np.arange(n) - np.repeat(starts, lengths)
+
+
+def _window_weights(pos: np.ndarray, k: int, alpha: float) -> np.ndarray:
+    """(3, n_rows, k) weights that turn a window into its mean, slope and EWMA."""
+    lag = np.arange(k)                                  # 0 = oldest, k-1 = current row
+    valid = lag >= (k - 1 - np.minimum(pos, k - 1))[:, None]
+    n_valid = valid.sum(axis=1, keepdims=True)
+
+    w_mean = valid / n_valid
+
+    t_bar = (valid * lag).sum(axis=1, keepdims=True) / n_valid
+    centred = valid * (lag - t_bar)
+    ss = (centred ** 2).sum(axis=1, keepdims=True)
+    w_slope = np.divide(centred, ss, out=np.zeros_like(centred), where=ss > 0)
+
+    decay = valid * (1 - alpha) ** (k - 1 - lag)
+    w_ewm = decay / decay.sum(axis=1, keepdims=True)
+
+    return np.stack([w_mean, w_slope, w_ewm])
+
+
+def window_features(values: np.ndarray, units: np.ndarray, windows=DEFAULT_WINDOWS, alpha: float = EWM_ALPHA) -> np.ndarray:
+    """
+    Rolling statistics for rows grouped by unit and ordered by cycle.
+    Each window is a strided view over the whole array (no copies, no loop over units);
+    rows from a previous unit get zero weight. Returns (n_rows, len(window_feature_names)).
+    """
+    values = np.asarray(values, dtype=float)
+    units = np.asarray(units)
+    n, f = values.shape
+    pos = _position_in_unit(units)
+    blocks = []
+    for k in windows:
+        padded = np.concatenate([np.zeros((k - 1, f)), values])
+        win = sliding_window_view(padded, k, axis=0)   # (n, f, k) view
+        stats = np.einsum("nfk,snk->snf", win, _window_weights(pos, k, alpha))
+        blocks.append(stats.transpose(1, 0, 2).reshape(n, -1))
+    return np.hstack(blocks) if blocks else np.empty((n, 0))
+
+
+def add_window_features(df, feature_cols, windows=DEFAULT_WINDOWS, unit_col="unit_number",
+                        time_col="time_in_cycles", alpha: float = EWM_ALPHA, cache_dir: Path = None):
+    """
+    Return df sorted by (unit, cycle) with rolling-window columns appended.
+    With cache_dir, results are memoized on disk with joblib.Memory (keyed on the input data).
+    """
+    import pandas as pd
+
+    df = df.sort_values([unit_col, time_col], kind="stable").reset_index(drop=True)
+    compute = window_features
+    if cache_dir is not None:
+        from joblib import Memory
+        compute = Memory(str(cache_dir), verbose=0).cache(window_features)
+    feats = compute(df[list(feature_cols)].to_numpy(dtype=float), df[unit_col].to_numpy(),
+                    tuple(windows), alpha)
+    names = window_feature_names(feature_cols, windows)
+    return pd.concat([df, pd.DataFrame(feats, columns=names, index=df.index)], axis=1)
+
+
+def sequence_window_features(values: np.ndarray, windows=DEFAULT_WINDOWS, alpha: float = EWM_ALPHA) -> np.ndarray:
+    """Window features of the latest row of one unit's (n_cycles, n_features) history."""
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values.reshape(1, -1)
+    values = values[-max(windows):]  # older cycles don't affect the last row
+    return window_features(values, np.zeros(len(values)), windows, alpha)[-1]
@@ -0,0 +1,33 @@
+"""
+Build the "fast" quality-tier tree subsets for the models the API actually serves.
+
+Loads the landing gear model with load_model() (the same Hugging Face file the API
+streams), picks the subset on held-out rows and writes it to models/tree_subsets.json,
+fingerprinted against that exact forest. Commit the updated tree_subsets.json.
+
+    python build_tree_subsets.py [held_out.csv]
+
+The CSV needs load_during_landing, tire_pressure, speed_during_landing and RUL columns
+(default: datasets/landing_gear_rul_clean.csv). Re-run it whenever the served model changes;
+until then ?quality=fast falls back to the full model.
+"""
+
+import sys
+from pathlib import Path
+import pandas as pd
+from app.inference import LG_FEATURES_TOP3
+from app.models_loader import load_model
+from app.tree_subsets import SUBSETS_PATH, build_tiers, print_tier_report, save_tiers
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_PATH = Path(sys.argv[1]) if len(sys.argv) > 1 else BASE_DIR / "datasets" / "landing_gear_rul_clean.csv"
+
+df = pd.read_csv(DATA_PATH)
+missing = [c for c in [*LG_FEATURES_TOP3, "RUL"] if c not in df.columns]
+if missing:
+    sys.exit(f"❌ {DATA_PATH} is missing columns {missing}")
+
+model = load_model("landing_gear")
+tiers = build_tiers(model, df[LG_FEATURES_TOP3].to_numpy(dtype=float), df["RUL"].to_numpy(dtype=float))
+print_tier_report("landing_gear", tiers)
+save_tiers("landing_gear", tiers, SUBSETS_PATH)
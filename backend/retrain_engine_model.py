@@ -4,17 +4,31 @@ Retrain Engine RUL Model (FD001)
 This will generate:
 - scaler_fd001.joblib
 - best_model_fd001.joblib
-in your models/ folder.
+in your models/ folder (plain engine requests are served by the Hugging Face Space,
+so only the windowed model gets "fast" tier subsets).
+
+Optional rolling-window training on exactly what /predict/engine/sequence receives
+(op settings and sensor_4/11/12, see ENGINE_SEQUENCE_FEATURES) plus per-unit means,
+slopes and EWMAs of those sensors:
+    ENGINE_WINDOWS=5,10,20 ENGINE_SUBSETS=FD001,FD002,FD003,FD004 python retrain_engine_model.py
+saves scaler_fd001_windowed.joblib / best_model_fd001_windowed.joblib instead. The model is
+stored as {"model", "windows", "features"} so /predict/engine/sequence rebuilds the same columns, and the
+train/test split keeps each unit's cycles on one side.
 """
 
+import os
+import time
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.ensemble import ExtraTreesRegressor
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import GroupShuffleSplit, train_test_split
 from sklearn.metrics import mean_absolute_error, r2_score
 import joblib
+from app.tree_subsets import SUBSETS_PATH, build_tiers, print_tier_report, save_tiers
+from app.inference import ENGINE_SEQUENCE_FEATURES, ENGINE_WINDOW_FEATURES
+from app.windows import add_window_features, window_feature_names
 print("🚀 Retraining script started!")
 
 # ----------------------------
@@ -23,6 +37,11 @@ print("🚀 Retraining script started!")
 BASE_DIR = Path(__file__).resolve().parent
 MODELS_DIR = BASE_DIR / "models"
 MODELS_DIR.mkdir(exist_ok=True)
+CACHE_DIR = BASE_DIR / ".window_cache"
+
+WINDOWS = tuple(int(k) for k in os.getenv("ENGINE_WINDOWS", "").split(",") if k.strip())
+SUBSETS = [s.strip() for s in os.getenv("ENGINE_SUBSETS", "FD001").split(",") if s.strip()]
+SUFFIX = "_windowed" if WINDOWS else ""
 
 # ----------------------------
 # 2. Load the dataset
@@ -31,7 +50,7 @@ MODELS_DIR.mkdir(exist_ok=True)
 # https://ti.arc.nasa.gov/tech/dash/groups/pcoe/prognostic-data-repository/
 # (Look for CMAPSS FD001 train_FD001.txt and test_FD001.txt)
 
-DATA_PATH = BASE_DIR / "train_FD001.txt"  # put the file here!
+DATA_PATH = BASE_DIR / "train_FD001.txt"  # put the file here! (train_FD002-4.txt too for ENGINE_SUBSETS)
 
 # Column definitions for FD001 dataset
 cols = [
@@ -40,9 +59,14 @@ cols = [
     *[f"sensor_{i}" for i in range(1, 22)]
 ]
 
-df = pd.read_csv(DATA_PATH, sep=" ", header=None)
-df.dropna(axis=1, how="all", inplace=True)
-df.columns = cols
+frames = []
+for i, subset in enumerate(SUBSETS):
+    part = pd.read_csv(DATA_PATH.with_name(f"train_{subset}.txt"), sep=" ", header=None)
+    part.dropna(axis=1, how="all", inplace=True)
+    part.columns = cols
+    part["unit_number"] += i * 1000  # keep unit ids unique across subsets
+    frames.append(part)
+df = pd.concat(frames, ignore_index=True)
 
 # ----------------------------
 # 3. Generate Remaining Useful Life (RUL)
@@ -54,6 +78,13 @@ rul = (
 )
 df = df.merge(rul, on="unit_number", how="left")
 df["RUL"] = df["max_cycles"] - df["time_in_cycles"]
+
+if WINDOWS:
+    t0 = time.perf_counter()
+    df = add_window_features(df, ENGINE_WINDOW_FEATURES, WINDOWS, cache_dir=CACHE_DIR)
+    print(f"🪟 Window features {WINDOWS} for {SUBSETS} built in {time.perf_counter() - t0:.2f}s")
+
+units = df["unit_number"].to_numpy()
 df.drop(columns=["unit_number", "max_cycles"], inplace=True)
 
 print("✅ Data loaded successfully!")
@@ -63,10 +94,20 @@ print(df.head())
 # ----------------------------
 # 4. Train/test split
 # ----------------------------
-X = df.drop(columns=["RUL"])
+if WINDOWS:
+    # Only the request's columns, then window columns (the order engine_sequence_to_array builds):
+    # time_in_cycles and the other sensors would be constants at serving time
+    X = df[ENGINE_SEQUENCE_FEATURES + window_feature_names(ENGINE_WINDOW_FEATURES, WINDOWS)]
+else:
+    X = df.drop(columns=["RUL"])
 y = df["RUL"]
 
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+if WINDOWS:
+    # Window rows overlap neighbouring cycles, so split whole units to keep the test set unseen
+    train_idx, test_idx = next(GroupShuffleSplit(n_splits=1, test_size=0.2, random_state=42).split(X, y, units))
+    X_train, X_test, y_train, y_test = X.iloc[train_idx], X.iloc[test_idx], y.iloc[train_idx], y.iloc[test_idx]
+else:
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
 # ----------------------------
 # 5. Scale features
@@ -99,19 +140,30 @@ print(f"Mean Absolute Error: {mae:.2f}")
 print(f"R² Score: {r2:.3f}")
 
 # ----------------------------
-# 8. Save model + scaler
+# 8. Quality tiers (tree subsets chosen on the held-out split)
+# ----------------------------
+# Only /predict/engine/sequence serves a local engine model; /predict/engine is proxied
+if WINDOWS:
+    tiers = build_tiers(model, X_test_scaled, y_test)
+    print_tier_report("engine_windowed", tiers)
+
+# ----------------------------
+# 9. Save model + scaler
 # ----------------------------
-scaler_path = MODELS_DIR / "scaler_fd001.joblib"
-model_path = MODELS_DIR / "best_model_fd001.joblib"
+scaler_path = MODELS_DIR / f"scaler_fd001{SUFFIX}.joblib"
+model_path = MODELS_DIR / f"best_model_fd001{SUFFIX}.joblib"
 
 joblib.dump(scaler, scaler_path)
-joblib.dump(model, model_path)
+joblib.dump({"model": model, "windows": list(WINDOWS), "features": list(X.columns)} if WINDOWS else model,
+            model_path)
 
 print(f"💾 Saved scaler to: {scaler_path}")
 print(f"💾 Saved model  to: {model_path}")
+if WINDOWS:
+    save_tiers("engine_windowed", tiers, SUBSETS_PATH)
 
 # ----------------------------
-# 9. Feature importance (optional)
+# 10. Feature importance (optional)
 # ----------------------------
 importances = model.feature_importances_
 feat_imp = pd.DataFrame({
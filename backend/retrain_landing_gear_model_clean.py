@@ -7,27 +7,35 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import r2_score, mean_absolute_error
 from pathlib import Path
 import json
+from app.tree_subsets import SUBSETS_PATH, build_tiers, print_tier_report, save_tiers
 
 # ========== Generate realistic dataset (scaled down) ==========
 np.random.seed(42)
 N = 1000  # more samples for smoother behavior
+N_VAL = 300  # held-out draw used to pick the "fast" tree subset
 
-df = pd.DataFrame({
-    "load_during_landing": np.random.uniform(200, 500, N),     # smaller, realistic range
-    "tire_pressure": np.random.uniform(150, 250, N),
-    "speed_during_landing": np.random.uniform(100, 300, N),
-})
 
-# Define realistic RUL behavior
-# Higher load & speed reduce RUL; tire pressure slightly helps
-df["RUL"] = (
-    400
-    - 0.4 * df["load_during_landing"]     # load penalty
-    - 0.3 * df["speed_during_landing"]    # speed penalty
-    + 0.5 * df["tire_pressure"]           # pressure benefit
-    + np.random.normal(0, 8, N)           # random noise
-)
-df["RUL"] = df["RUL"].clip(lower=10)
+def make_landing_gear_data(n):
+    df = pd.DataFrame({
+        "load_during_landing": np.random.uniform(200, 500, n),     # smaller, realistic range
+        "tire_pressure": np.random.uniform(150, 250, n),
+        "speed_during_landing": np.random.uniform(100, 300, n),
+    })
+
+    # Define realistic RUL behavior
+    # Higher load & speed reduce RUL; tire pressure slightly helps
+    df["RUL"] = (
+        400
+        - 0.4 * df["load_during_landing"]     # load penalty
+        - 0.3 * df["speed_during_landing"]    # speed penalty
+        + 0.5 * df["tire_pressure"]           # pressure benefit
+        + np.random.normal(0, 8, n)           # random noise
+    )
+    df["RUL"] = df["RUL"].clip(lower=10)
+    return df
+
+
+df = make_landing_gear_data(N)
 
 # ========== Train model ==========
 X = df[["load_during_landing", "tire_pressure", "speed_during_landing"]]
@@ -50,12 +58,19 @@ mae = mean_absolute_error(y, pred)
 
 print(f"✅ Landing-Gear model trained: R²={r2:.3f}, MAE={mae:.2f}")
 
+# ========== Quality tiers ==========
+df_val = make_landing_gear_data(N_VAL)
+tiers = build_tiers(model, df_val[X.columns], df_val["RUL"])
+print_tier_report("landing_gear", tiers)
+
 # ========== Save model ==========
-models_dir = Path("models")
+models_dir = Path(__file__).resolve().parent / "models"  # same folder whatever the cwd
 models_dir.mkdir(exist_ok=True)
 out_path = models_dir / "best_rul_model_top3.joblib"
 joblib.dump(model, out_path)
 print(f"💾 Saved model to {out_path.resolve()}")
+# Only valid if this exact file is what gets uploaded and served; otherwise run build_tree_subsets.py
+save_tiers("landing_gear", tiers, SUBSETS_PATH)
 
 # ========== Update feature_defaults.json ==========
 feature_defaults = {
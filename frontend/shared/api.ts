@@ -40,6 +40,26 @@ export interface TrendPoint {
   healthScore: number;
 }
 
+/**
+ * 👇 One downsampled bucket from GET /history (timestamp in Unix seconds)
+ */
+export interface HistoryPoint {
+  timestamp: number;
+  predicted_rul: number;
+  min_rul: number;
+  max_rul: number;
+  count: number;
+}
+
+/**
+ * 👇 Stored RUL trend for one unit and subsystem
+ */
+export interface HistoryResponse {
+  unit_id: string;
+  subsystem: SubsystemId;
+  points: HistoryPoint[];
+}
+
 /**
  * 👇 Example response for Builder.io testing or API demo
  */